@@ -5,6 +5,7 @@ import matplotlib.colors as colors
 
 import matplotlib.pyplot as plt
 import numpy as np
+import multiprocessing
 import sys
 import deriv
 
@@ -32,6 +33,7 @@ r200c_scale = 1.0
 
 SUBHALO_LIM = 40
 PLOT_INDIV = False
+PROCS = multiprocessing.cpu_count()
 
 if L == 62.5:
     m_ids = [522, 2991, 4250, 4302, 4565, 6862, 8092]
@@ -59,24 +61,6 @@ params = {"flat":True, "H0":70, "Om0":0.27,
           "Ob0":0.0469, "sigma8":0.82, "ns":0.95}
 cosmo = cosmology.setCosmology("meowCosmo", params)
 
-sub_cols = map(np.array, zip(*np.loadtxt(sub_file)))
-s_ids = np.array(sub_cols[0], dtype=int)
-h_ids = np.array(sub_cols[2], dtype=int)
-tree_cols = map(np.array, zip(*np.loadtxt(tree_file)))
-tree_ids = np.array(tree_cols[0], dtype=int)
-tree_snaps = np.array(tree_cols[1], dtype=int)
-scales, xs, ys, zs, rs, ms = tree_cols[2:]
-rad_cols = map(np.array, zip(*np.loadtxt(rad_file)))
-rad_ids, _, m_sp, r_sp, r_min, r_max, r200m, m200c, gamma = rad_cols
-
-print "text loaded"
-
-rad_info = {}
-for i in xrange(len(rad_ids)):
-    rad_info[rad_ids[i]] = (m_sp[i], r_sp[i], r_min[i], r_max[i],
-                            r200m[i], m200c[i], gamma[i])
-
-
 prof_info = {}
 def split_profs():
     rows = map(np.array, np.loadtxt(prof_file))
@@ -91,283 +75,341 @@ def split_profs():
             prof_info[ids[end]] = vals[start:end]
 #split_profs()
 
+def periodic_wrap(dx):
+    """ periodic_wrap maps a displacement (or an array of displacements)
+    along one box axis onto [-L/2, L/2] without branching.
+    """
+    return dx - L * np.round(dx / L)
+
 class Halo(object):
-    def __init__(self, start, end):
-        self.id = tree_ids[end - 1]
-
-        self.scales = scales[start:end]
-        self.ts = cosmo.age(1/self.scales - 1)
-        self.xs = xs[start:end]
-        self.ys = ys[start:end]
-        self.zs = zs[start:end]
-        self.rs = rs[start:end]
-        self.ms = ms[start:end]
+    def __init__(self, id, scales, ts, xs, ys, zs, rs, ms):
+        self.id = id
+
+        self.scales = scales
+        self.ts = ts
+        self.xs = xs
+        self.ys = ys
+        self.zs = zs
+        self.rs = rs
+        self.ms = ms
         self.subs = []
     def add_sub(self, h):
         self.subs.append(h)
     def displace(self, host):
-        for i in xrange(min(len(self.xs), len(host.xs))):
-            self.xs[-i] -= host.xs[-i]
-            if self.xs[-i] > L/2: self.xs[-i] -= L
-            if self.xs[-i] < -L/2: self.xs[-i] += L
-            self.ys[-i] -= host.ys[-i]
-            if self.ys[-i] > L/2: self.ys[-i] -= L
-            if self.ys[-i] < -L/2: self.ys[-i] += L
-            self.zs[-i] -= host.zs[-i]
-            if self.zs[-i] > L/2: self.zs[-i] -= L
-            if self.zs[-i] < -L/2: self.zs[-i] += L
-            
-        self.ds = np.sqrt(self.xs**2 + self.ys**2 + self.zs**2)
-        self.phis = np.arccos(self.zs / self.ds)
-        self.ths = np.arctan2(self.ys, self.xs)
+        l = min(len(self.xs), len(host.xs))
+        self.xs[-l:] = periodic_wrap(self.xs[-l:] - host.xs[-l:])
+        self.ys[-l:] = periodic_wrap(self.ys[-l:] - host.ys[-l:])
+        self.zs[-l:] = periodic_wrap(self.zs[-l:] - host.zs[-l:])
+
+        xyzs = np.column_stack((self.xs, self.ys, self.zs))
+        self.ds = np.sqrt(np.einsum("ij,ij->i", xyzs, xyzs))
         self.host_rs = host.rs
 
-        self.vxs = deriv.vector_deriv(self.ts, self.xs) * self.scales * 31.54
-        self.vys = deriv.vector_deriv(self.ts, self.ys) * self.scales * 31.54
-        self.vzs = deriv.vector_deriv(self.ts, self.zs) * self.scales * 31.54
-        self.vs = np.sqrt(self.vxs**2 + self.vys**2 + self.zs**2)
-        self.vrs = np.abs(deriv.vector_deriv(self.ts, self.ds) * self.scales * 31.54)
+        scale_kms = self.scales * 31.54
+        self.vxs = deriv.vector_deriv(self.ts, self.xs)
+        self.vxs *= scale_kms
+        self.vys = deriv.vector_deriv(self.ts, self.ys)
+        self.vys *= scale_kms
+        self.vzs = deriv.vector_deriv(self.ts, self.zs)
+        self.vzs *= scale_kms
+        vxyzs = np.column_stack((self.vxs, self.vys, self.vzs))
+        self.vs = np.sqrt(np.einsum("ij,ij->i", vxyzs, vxyzs))
+        # v_r = (x . v) / |x|, so no separate derivative of ds is needed.
+        self.vrs = np.abs(np.einsum("ij,ij->i", xyzs, vxyzs) / self.ds)
 
     def perihelion(self):
         l = min(len(self.ds), len(self.host_rs))
         i = np.argmin(self.ds[-l:])
 
         hi = i - l
+        phi = np.arccos(self.zs[hi] / self.ds[hi])
+        th = np.arctan2(self.ys[hi], self.xs[hi])
         return (self.ds[hi], self.ds[hi]/self.host_rs[hi],
-                self.phis[hi], self.ths[hi], self.ts[hi])
-start = 0
-hs = {}
-for i in xrange(len(tree_ids)):
-    if tree_ids[i] == -1:
-        h = Halo(start, i)
-        start = i + 1
+                phi, th, self.ts[hi])
+
+def perihelia(subs):
+    """ perihelia returns the pericentric distance, the pericentric distance in
+    units of the host radius, and the pericentric time of every subhalo in
+    subs. It gives the same results as calling Halo.perihelion on each
+    subhalo, but does the work for all of them at once.
+    """
+    if len(subs) == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+
+    ls = [min(len(sub.ds), len(sub.host_rs)) for sub in subs]
+    starts = np.concatenate(([0], np.cumsum(ls)[:-1]))
+    ds = np.concatenate([sub.ds[-l:] for sub, l in zip(subs, ls)])
+    host_rs = np.concatenate([sub.host_rs[-l:] for sub, l in zip(subs, ls)])
+    ts = np.concatenate([sub.ts[-l:] for sub, l in zip(subs, ls)])
+
+    # Sorting by (subhalo, distance) puts each subhalo's closest approach at
+    # the start of its block. lexsort is stable, so ties resolve to the
+    # earliest snapshot, just like np.argmin.
+    sub_idxs = np.repeat(np.arange(len(subs)), ls)
+    peri = np.lexsort((ds, sub_idxs))[starts]
+    return ds[peri], ds[peri] / host_rs[peri], ts[peri]
+
+def read_cols(path):
+    """ read_cols reads a whitespace-separated text table and returns its
+    columns as the rows of a 2D array, like np.loadtxt(path, unpack=True).
+    pandas is optional: its C parser is much faster than np.loadtxt on the
+    tree file, but np.loadtxt is used when pandas isn't installed.
+    """
+    try:
+        import pandas as pd
+    except ImportError:
+        return np.loadtxt(path, unpack=True)
+
+    table = pd.read_csv(path, sep=r"\s+", header=None, comment="#",
+                        dtype=np.float64)
+    return table.values.T
+
+def read_hosts():
+    """ read_hosts reads sub_file, tree_file, and rad_file and returns a list
+    of host Halos with their radii set and their subhalos attached.
+    """
+    sub_cols = read_cols(sub_file)
+    s_ids = sub_cols[0].astype(np.int64)
+    h_ids = sub_cols[2].astype(np.int64)
+    tree_cols = read_cols(tree_file)
+    tree_ids = tree_cols[0].astype(np.int64)
+    tree_snaps = tree_cols[1].astype(np.int64)
+    # Single precision is plenty for positions within the box and halves the
+    # memory traffic of every pass over the histories. Times stay in double.
+    scales, xs, ys, zs, rs, ms = tree_cols[2:].astype(np.float32)
+    rad_cols = read_cols(rad_file)
+    rad_ids, _, m_sp, r_sp, r_min, r_max, r200m, m200c, gamma = rad_cols
+
+    print "text loaded"
+
+    rho_200c_vol = (cosmo.rho_c(0)*200)*1e9*4*np.pi/3
+    r200c = (m200c / rho_200c_vol)**(1/3)
+
+    # Terminator rows don't hold a valid scale factor, so leave them out of
+    # the single cosmo.age call.
+    is_halo = tree_ids != -1
+    all_ts = np.zeros(len(scales))
+    all_ts[is_halo] = cosmo.age(1/scales[is_halo] - 1)
+
+    ends = np.flatnonzero(~is_halo)
+    starts = np.concatenate(([0], ends + 1))
+    ends = np.concatenate((ends, [len(tree_ids)]))
+    hs = {}
+    for start, end in zip(starts, ends):
+        s = slice(start, end)
+        h = Halo(tree_ids[end - 1], scales[s], all_ts[s],
+                 xs[s], ys[s], zs[s], rs[s], ms[s])
         hs[h.id] = h
-h = Halo(start, len(tree_ids))
-hs[h.id] = h
 
-print "created Halos."
-
-hosts = []
-for i, id in enumerate(s_ids):
-    if s_ids[i] == h_ids[i]:
+    print "created Halos."
+
+    is_host = s_ids == h_ids
+    host_ids = s_ids[is_host]
+
+    # Find every host's row in rad_file at once through a sorted copy of its
+    # ids.
+    rad_order = np.argsort(rad_ids)
+    idxs = np.searchsorted(rad_ids[rad_order], host_ids)
+    # Ids past the end of rad_ids would index out of bounds; clip them so
+    # that the check below reports them along with every other missing id.
+    rows = rad_order[np.minimum(idxs, len(rad_ids) - 1)]
+    missing = host_ids[rad_ids[rows] != host_ids]
+    assert len(missing) == 0, "host ids %s missing from %s" % (
+        list(missing), rad_file,
+    )
+
+    hosts = []
+    for id, row in zip(host_ids, rows):
         hosts.append(hs[id])
-        m_sp, r_sp, r_min, r_max, r200m, m200c, gamma = rad_info[id]
         #r_prof, rho_prof = zip(*prof_info[id])
-        hs[id].m_sp = m_sp
-        hs[id].r_sp = r_sp
-        hs[id].r_min = r_min
-        hs[id].r_max = r_max
-        hs[id].r200m = r200m
-        hs[id].gamma = gamma
-        hs[id].m200c = m200c
-        hs[id].r200c = (m200c/((cosmo.rho_c(0)*200)*1e9*4*np.pi/3))**0.333
+        hs[id].m_sp = m_sp[row]
+        hs[id].r_sp = r_sp[row]
+        hs[id].r_min = r_min[row]
+        hs[id].r_max = r_max[row]
+        hs[id].r200m = r200m[row]
+        hs[id].gamma = gamma[row]
+        hs[id].m200c = m200c[row]
+        hs[id].r200c = r200c[row]
         #hs[id].r_prof = r_prof
         #hs[id].rho_prof = rho_prof
         if m_ids is None:
             hs[id].m_id = None
         else:
             hs[id].m_id = m_ids[len(hosts) - 1]
-    else:
-        hs[h_ids[i]].add_sub(hs[id])
-p_r200m, p_r_sp, p_r_max, p_r200c = [], [], [], []
-b_r200m, b_r_sp, b_r_max, b_r200c, b_r90 = [], [], [], [], []
-r85_r_sp, r90_r_sp, r95_r_sp = [], [], []
-edges = None
-sub_counts = []
 
-ds_r200m, ds_r_sp, ds_r_max, xps_all = [], [], [], []
+    for id, host_id in zip(s_ids[~is_host], h_ids[~is_host]):
+        hs[host_id].add_sub(hs[id])
+    return hosts
 
 def vol(r): return 4 * np.pi / 3 * r**3
 
-for (i, host) in enumerate(hosts):
-    if i % 10 == 0: print i
+def stacked_histogram(rows, bins, lo, hi):
+    """ stacked_histogram bins every row of the 2D array rows into bins
+    equal-width bins spanning [lo, hi] and returns a (len(rows), bins) array
+    of counts. Each row is binned the same way np.histogram would bin it, but
+    all rows are counted in a single pass.
+    """
+    edges = np.linspace(lo, hi, bins + 1)
+    ok = (rows >= lo) & (rows <= hi)
+    row_idxs, _ = np.nonzero(ok)
+    vals = rows[ok]
+
+    idx = ((vals - lo) * (bins / (hi - lo))).astype(np.int64)
+    # Like np.histogram, the last bin is closed on the right.
+    idx[idx == bins] -= 1
+    # Also like np.histogram, move values which rounding put on the wrong
+    # side of a bin edge back into the right bin.
+    idx[vals < edges[idx]] -= 1
+    idx[(vals >= edges[idx + 1]) & (idx != bins - 1)] += 1
+
+    counts = np.bincount(row_idxs * bins + idx, minlength=len(rows) * bins)
+    return counts.reshape(len(rows), bins)
+
+r_lo, r_hi, bins = 0.1, 2, 25
+edges = np.linspace(r_lo, r_hi, bins + 1)
+inv_shell_vols = 1 / (vol(edges[1:]) - vol(edges[:-1]))
+
+def floor(vals):
+    #lim = 0.01
+    #vals[vals <= lim] = lim
+    return vals
+
+linthreshy = 0.03
+# -2 sigma, -1 sigma, median, +1 sigma, +2 sigma.
+QUANTILES = np.array([0.025, 0.16, 0.5, 0.84, 0.975])
+
+def plot_density(fig_num, b_prof, color, name, scale):
+    """ plot_density plots the median and 1 and 2 sigma bands of the stacked
+    number density profiles in b_prof against radius in units of R_name.
+    """
+    xs = (edges[:-1] + edges[1:]) / 2
+
+    plt.figure(fig_num)
+    m2s, m1s, med, p1s, p2s = np.quantile(b_prof, QUANTILES, axis=0)
+    plt.fill_between(xs, floor(m2s), floor(p2s), facecolor=color, alpha=0.3)
+    plt.fill_between(xs, floor(m1s), floor(p1s), facecolor=color, alpha=0.3)
+    plt.plot(xs, floor(p2s), c=color, lw=1)
+    plt.plot(xs, floor(m2s), c=color, lw=1)
+    plt.plot(xs, floor(p1s), c=color, lw=1)
+    plt.plot(xs, floor(m1s), c=color, lw=1)
+    plt.plot(xs, floor(med), c=color, lw=3)
+    plt.xscale("log")
+    plt.yscale("symlog", linthreshy=linthreshy)
+    lo, hi = plt.ylim()
+    plt.plot([1, 1], [lo, hi], "--k")
+    plt.ylim(lo, hi)
+    plt.title(r"$R/R_{\rm %s}$" % name)
+    plt.ylabel(r"$n(r)/(N_{\rm tot}V_{\rm %s})$" % name)
+    if scale == 1.0:
+        plt.xlabel(r"$R/R_{\rm %s}$" % name)
+    else:
+        plt.xlabel(r"$R/(%.1f\ R_{\rm %s})$" % (scale, name))
+
+def plot_host(host, xs, xps, ts):
+    plt.figure()
+    plt.scatter(xs, xps, c=ts, s=70)
+    plt.hot()
+    plt.colorbar()
+
+    xlo, xhi = plt.xlim()
+    ylo, yhi = plt.ylim()
+    yhi, xhi = 3, 3
+    ylo, xlo = 0, 0
+    hilim = max(xhi, yhi)
+    lolim = min(xlo, ylo)
+    plt.plot([lolim, hilim], [lolim, hilim], "k")
+    plt.xlim(xlo, xhi)
+    plt.ylim(ylo, yhi)
+
+    plt.plot([host.r_sp / host.r200m, host.r_sp / host.r200m], [0, yhi],
+             "r", lw=3, label=r"gotetra $R_{\rm sp}$")
+    plt.plot([host.r_min / host.r200m, host.r_min / host.r200m], [0, yhi],
+             "r", lw=1)
+    plt.plot([host.r_max / host.r200m, host.r_max / host.r200m], [0, yhi],
+             "r", lw=1, label=r"gotetra shell bounds")
+    plt.plot([1, 1], [0, yhi], "--k",
+             lw=3, label=r"$R_{\rm 200m}$")
+
+    if host.m_id is not None:
+        plt.title("Halo %d" % host.m_id)
+    else:
+        plt.title(r"$\rm \log_{10}M_{\rm 200c}$ = %.1g $\Gamma$ = %.2f" %
+                  (host.m200c, host.gamma))
+    plt.xlabel(r"$R(z=0)/R_{\rm 200m}(z=0)$")
+    plt.ylabel(r"$R(z=z_{\rm peri})/R_{\rm 200m}(z=z_{\rm peri})$")
+    plt.legend(loc="upper left")
+
+def eps_eq(x, y):
+    eps = 0.01
+    return np.abs(x - y) < eps
+
+# Filled in by main() before the worker pool forks, so that the workers
+# inherit the tree histories instead of having them pickled over.
+hosts = []
+
+def process_host(i):
+    """ process_host displaces the subhalos of hosts[i] and returns the number
+    of subhalos which pass the pericenter cut, their normalized R_sp, R_max,
+    R_200m, and R_200c profiles (None if there are SUBHALO_LIM or fewer), and
+    the (xs, xps, ts) arrays plotted by plot_host (None unless PLOT_INDIV is
+    set).
+
+    process_host only reads module-level state, so it can be run on
+    different hosts in separate processes.
+    """
+    host = hosts[i]
     for sub in host.subs: sub.displace(host)
 
-    ds, dps, xps, phis, ths, ts = [], [], [], [], [], []
-    for sub in host.subs:
-        dp, xp, _, _, t = sub.perihelion()
-        ds.append(sub.ds[-1])
-        dps.append(dp)
-        xps.append(xp)
-        phis.append(sub.phis[-1])
-        ths.append(sub.ths[-1])
-        ts.append(t)
-    ds, dps, phis = np.array(ds), np.array(dps), np.array(phis)
-    xps, ths, ts = np.array(xps), np.array(ths), np.array(ts)
+    dps, xps, ts = perihelia(host.subs)
+    ds = np.array([sub.ds[-1] for sub in host.subs])
     xs = ds / host.rs[-1]
-    if PLOT_INDIV:
-        plt.figure()
-        plt.scatter(xs, xps, c=ts, s=70)
-        plt.hot()
-        plt.colorbar()
-
-        xlo, xhi = plt.xlim()
-        ylo, yhi = plt.ylim()
-        yhi, xhi = 3, 3
-        ylo, xlo = 0, 0
-        hilim = max(xhi, yhi)
-        lolim = min(xlo, ylo)
-        plt.plot([lolim, hilim], [lolim, hilim], "k")
-        plt.xlim(xlo, xhi)
-        plt.ylim(ylo, yhi) 
-    
-        plt.plot([host.r_sp / host.r200m, host.r_sp / host.r200m], [0, yhi],
-                 "r", lw=3, label=r"gotetra $R_{\rm sp}$")
-        plt.plot([host.r_min / host.r200m, host.r_min / host.r200m], [0, yhi],
-                 "r", lw=1)
-        plt.plot([host.r_max / host.r200m, host.r_max / host.r200m], [0, yhi],
-                 "r", lw=1, label=r"gotetra shell bounds")
-        plt.plot([1, 1], [0, yhi], "--k",
-                 lw=3, label=r"$R_{\rm 200m}$")
-
-        if host.m_id is not None:
-            plt.title("Halo %d" % host.m_id)
-        else:
-            plt.title(r"$\rm \log_{10}M_{\rm 200c}$ = %.1g $\Gamma$ = %.2f" % 
-                      (host.m200c, host.gamma))
-        plt.xlabel(r"$R(z=0)/R_{\rm 200m}(z=0)$")
-        plt.ylabel(r"$R(z=z_{\rm peri})/R_{\rm 200m}(z=z_{\rm peri})$")
-        plt.legend(loc="upper left")
-
-    def eps_eq(x, y):
-        eps = 0.01
-        return np.abs(x - y) < eps
     mask = (~eps_eq(xps, xs)) & (xps < 1) & (ds > 0)
 
     n = np.sum(mask)
-    sub_counts.append(n)
-    r_lo, r_hi = 0.1, 2
-    if n > SUBHALO_LIM:
-        bins = 25
-
-        vals, edges = np.histogram(
-            (ds / host.r_sp * r_sp_scale)[mask],
-            bins=bins, range=(r_lo, r_hi),
-        )
+    plot_vals = (xs, xps, ts) if PLOT_INDIV else None
+    if n <= SUBHALO_LIM: return n, None, plot_vals
 
-        b_r_sp.append(vals / (vol(edges[1:]) - vol(edges[:-1])) / n)
+    scaled_ds = ds[mask] * np.array([
+        [r_sp_scale / host.r_sp], [r_max_scale / host.r_max],
+        [r200m_scale / host.r200m], [r200c_scale / host.r200c],
+    ])
+    vals = stacked_histogram(scaled_ds, bins, r_lo, r_hi)
+    return n, vals * inv_shell_vols / n, plot_vals
 
-        vals, _ = np.histogram(
-            (ds / host.r_max * r_max_scale)[mask],
-            bins=bins, range=(r_lo, r_hi),
-        )
+def main():
+    hosts[:] = read_hosts()
 
-        b_r_max.append(vals / (vol(edges[1:]) - vol(edges[:-1])) / n)
+    pool = multiprocessing.Pool(PROCS)
+    try:
+        results = pool.map(process_host, range(len(hosts)))
+    finally:
+        pool.close()
+        pool.join()
 
-        vals, _ = np.histogram(
-            (ds / host.r200m * r200m_scale)[mask],
-            bins=bins, range=(r_lo, r_hi),
-        )
+    print "processed hosts."
 
-        b_r200m.append(vals / (vol(edges[1:]) - vol(edges[:-1])) / n)
+    sub_counts = []
 
-        vals, _ = np.histogram(
-            (ds / host.r200c * r200c_scale)[mask],
-            bins=bins, range=(r_lo, r_hi),
-        )
+    # Rows are R_sp, R_max, R_200m, R_200c. Only the first used_hosts columns
+    # are filled in by the end of the loop.
+    b_profs = np.empty((4, len(hosts), bins))
+    used_hosts = 0
 
-        b_r200c.append(vals / (vol(edges[1:]) - vol(edges[:-1])) / n)
+    for host, (n, profs, plot_vals) in zip(hosts, results):
+        if PLOT_INDIV: plot_host(host, *plot_vals)
+        sub_counts.append(n)
+        if profs is not None:
+            b_profs[:, used_hosts] = profs
+            used_hosts += 1
 
-xs = (edges[:-1] + edges[1:]) / 2
-
-def floor(vals):
-    #lim = 0.01
-    #vals[vals <= lim] = lim
-    return vals
+    b_r_sp, b_r_max, b_r200m, b_r200c = b_profs[:, :used_hosts]
 
-linthreshy = 0.03
+    plot_density(36, b_r_sp, "green", "sp", r_sp_scale)
+    plot_density(37, b_r_max, "blue", "max", r_max_scale)
+    plot_density(38, b_r200m, "red", "200m", r200m_scale)
+    plot_density(39, b_r200c, "magenta", "200c", r200c_scale)
 
-plt.figure(36)
-m2s, m1s, med, p1s, p2s = np.percentile(
-    b_r_sp, [50-95/2, 50-68/2, 50, 50+68/2, 50+95/2], axis=0,
-)
-plt.fill_between(xs, floor(m2s), floor(p2s), facecolor="green", alpha=0.3)
-plt.fill_between(xs, floor(m1s), floor(p1s), facecolor="green", alpha=0.3)
-plt.plot(xs, floor(p2s), c="g", lw=1)
-plt.plot(xs, floor(m2s), c="g", lw=1)
-plt.plot(xs, floor(p1s), c="g", lw=1)
-plt.plot(xs, floor(m1s), c="g", lw=1)
-plt.plot(xs, floor(med), c="g", lw=3)
-plt.xscale("log")
-plt.yscale("symlog", linthreshy=linthreshy)
-lo, hi = plt.ylim()
-
-plt.plot([1, 1], [lo, hi], "--k")
-plt.ylim(lo, hi)
-plt.title(r"$R/R_{\rm sp}$")
-plt.ylabel(r"$n(r)/(N_{\rm tot}V_{\rm sp})$")
-if r_sp_scale == 1.0:
-    plt.xlabel(r"$R/R_{\rm sp}$")
-else:
-    plt.xlabel(r"$R/(%.1f\ R_{\rm sp})$" % r_sp_scale)
-
-plt.figure(37)
-m2s, m1s, med, p1s, p2s = np.percentile(
-    b_r_max, [50-95/2, 50-68/2, 50, 50+68/2, 50+95/2], axis=0,
-)
-plt.fill_between(xs, floor(m2s), floor(p2s), facecolor="blue", alpha=0.3)
-plt.fill_between(xs, floor(m1s), floor(p1s), facecolor="blue", alpha=0.3)
-plt.plot(xs, floor(p2s), c="b", lw=1)
-plt.plot(xs, floor(m2s), c="b", lw=1)
-plt.plot(xs, floor(p1s), c="b", lw=1)
-plt.plot(xs, floor(m1s), c="b", lw=1)
-plt.plot(xs, floor(med), c="b", lw=3)
-plt.xscale("log")
-plt.yscale("symlog", linthreshy=linthreshy)
-lo, hi = plt.ylim()
-plt.plot([1, 1], [lo, hi], "--k")
-plt.ylim(lo, hi)
-plt.title(r"$R/R_{\rm max}$")
-plt.ylabel(r"$n(r)/(N_{\rm tot}V_{\rm max})$")
-if r_max_scale == 1.0:
-    plt.xlabel(r"$R/R_{\rm max}$")
-else:
-    plt.xlabel(r"$R/(%.1f\ R_{\rm max})$" % r_max_scale)
-
-plt.figure(38)
-m2s, m1s, med, p1s, p2s = np.percentile(
-    b_r200m, [50-95/2, 50-68/2, 50, 50+68/2, 50+95/2], axis=0,
-)
-plt.fill_between(xs, floor(m2s), floor(p2s), facecolor="red", alpha=0.3)
-plt.fill_between(xs, floor(m1s), floor(p1s), facecolor="red", alpha=0.3)
-plt.plot(xs, floor(p2s), c="r", lw=1)
-plt.plot(xs, floor(m2s), c="r", lw=1)
-plt.plot(xs, floor(p1s), c="r", lw=1)
-plt.plot(xs, floor(m1s), c="r", lw=1)
-plt.plot(xs, floor(med), c="r", lw=3)
-plt.xscale("log")
-plt.yscale("symlog", linthreshy=linthreshy)
-lo, hi = plt.ylim()
-plt.plot([1, 1], [lo, hi], "--k")
-plt.ylim(lo, hi)
-plt.title(r"$R/R_{\rm 200m}$")
-plt.ylabel(r"$n(r)/(N_{\rm tot}V_{\rm 200m})$")
-if r200m_scale == 1.0:
-    plt.xlabel(r"$R/R_{\rm 200m}$")
-else:
-    plt.xlabel(r"$R/(%.1f\ R_{\rm 200m})$" % r200m_scale)
-
-plt.figure(39)
-m2s, m1s, med, p1s, p2s = np.percentile(
-    b_r200c, [50-95/2, 50-68/2, 50, 50+68/2, 50+95/2], axis=0,
-)
-plt.fill_between(xs, floor(m2s), floor(p2s), facecolor="magenta", alpha=0.3)
-plt.fill_between(xs, floor(m1s), floor(p1s), facecolor="magenta", alpha=0.3)
-plt.plot(xs, floor(p2s), c="m", lw=1)
-plt.plot(xs, floor(m2s), c="m", lw=1)
-plt.plot(xs, floor(p1s), c="m", lw=1)
-plt.plot(xs, floor(m1s), c="m", lw=1)
-plt.plot(xs, floor(med), c="m", lw=3)
-plt.xscale("log")
-plt.yscale("symlog", linthreshy=linthreshy)
-lo, hi = plt.ylim()
-plt.plot([1, 1], [lo, hi], "--k")
-plt.ylim(lo, hi)
-plt.title(r"$R/R_{\rm 200c}$")
-plt.ylabel(r"$n(r)/(N_{\rm tot}V_{\rm 200c})$")
-if r200c_scale == 1.0:
-    plt.xlabel(r"$R/R_{\rm 200c}$")
-else:
-    plt.xlabel(r"$R/(%.1f\ R_{\rm 200c})$" % r200c_scale)
+    plt.show()
 
-plt.show()
+if __name__ == "__main__":
+    main()